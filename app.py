@@ -1,71 +1,220 @@
 import streamlit as st
-import nbformat
-from nbconvert import WebPDFExporter
+import hashlib
+import importlib.metadata
 import os
+import pathlib
+import subprocess
 import sys
+import threading
 import asyncio
-import playwright
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# --- Headless Browser ---
+
+# Records the Playwright version of the last successful install, so later
+# server processes skip the `playwright install` CLI until Playwright changes.
+PLAYWRIGHT_MARKER = pathlib.Path.home() / ".cache" / "ipynb2pdf" / ".playwright_ok"
+
+
+@st.cache_resource
+def install_browser():
+    """
+    Installs Playwright's Chromium build and its system dependencies. Cached so
+    it runs at most once per server process, and skipped altogether while the
+    marker file records a successful install for the current Playwright version.
+    """
+    try:
+        version = importlib.metadata.version("playwright")
+        if PLAYWRIGHT_MARKER.exists() and PLAYWRIGHT_MARKER.read_text() == version:
+            return
+    except Exception:
+        # Silently fail if Playwright's metadata or the marker cannot be read
+        return
+
+    # This is a fallback, ideally handled by packages.txt on deployment.
+    # Installing system dependencies needs root; if that is not possible,
+    # still try to fetch the browser itself. Every conversion waits on this
+    # cached call, so the CLI runs without stdin or a controlling terminal
+    # (sudo fails instead of prompting for a password) and with a time limit.
+    for args in (["install", "--with-deps", "chromium"], ["install", "chromium"]):
+        try:
+            completed = subprocess.run(
+                [sys.executable, "-m", "playwright", *args],
+                check=False,
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+                timeout=600,
+            )
+        except Exception:
+            # Silently try the next command if this one hangs or cannot be spawned
+            continue
+        if completed.returncode == 0:
+            try:
+                PLAYWRIGHT_MARKER.parent.mkdir(parents=True, exist_ok=True)
+                PLAYWRIGHT_MARKER.write_text(version)
+            except OSError:
+                pass
+            return
+
+
+def browser_is_alive(resource):
+    """
+    Checks a cached browser before it is reused. If Chromium has crashed or been
+    killed, its Playwright driver and executor are shut down and False is
+    returned, so that get_browser launches a fresh instance.
+    """
+    executor, playwright, browser = resource
+    try:
+        if executor.submit(browser.is_connected).result():
+            return True
+        executor.submit(playwright.stop).result()
+    except Exception:
+        pass
+    executor.shutdown(wait=False)
+    return False
+
+
+@st.cache_resource(validate=browser_is_alive)
+def get_browser():
+    """
+    Launches a headless Chromium instance that is kept alive and shared by all
+    conversions, so only the first conversion pays the browser start-up cost.
+
+    Playwright's sync API objects can only be used from the thread that created
+    them, while Streamlit runs every script rerun in its own thread. The browser
+    is therefore owned by a dedicated single-thread executor and all page work
+    is submitted to it.
+
+    Returns:
+        ThreadPoolExecutor: The executor that owns the browser.
+        Playwright: The running Playwright driver.
+        Browser: The running Playwright browser.
+    """
+    install_browser()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chromium")
+
+    def launch():
+        from playwright.sync_api import sync_playwright
+        playwright = sync_playwright().start()
+        try:
+            return playwright, playwright.chromium.launch(headless=True)
+        except Exception:
+            playwright.stop()
+            raise
+
+    try:
+        playwright, browser = executor.submit(launch).result()
+    except Exception:
+        executor.shutdown(wait=False)
+        # The browser files may be missing (e.g. a wiped cache), so forget the
+        # previous install and run it again on the next attempt
+        PLAYWRIGHT_MARKER.unlink(missing_ok=True)
+        install_browser.clear()
+        raise
+    return executor, playwright, browser
+
+
+def render_pdf(browser, html):
+    """
+    Prints an HTML document to PDF in a new page of the shared browser.
+    Must be called on the browser's executor thread.
+    """
+    page = browser.new_page()
+    try:
+        # Lay the page out for print from the start, so Chromium does not
+        # do a screen layout first and reflow it when printing.
+        page.emulate_media(media="print")
+        # The HTML is loaded straight from memory (no temporary file or file://
+        # navigation); wait for external scripts such as MathJax to settle.
+        page.set_content(html, wait_until="networkidle", timeout=60000)
+        return page.pdf(format="A4", prefer_css_page_size=True, print_background=True)
+    finally:
+        page.close()
+
 
 # --- Core Conversion Logic ---
 
-def convert_notebook_to_pdf(notebook_path, output_path):
+def file_digest(path):
+    """
+    Returns a short BLAKE2b hex digest of a file's contents, read in 1 MiB chunks.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@st.cache_data(max_entries=32, ttl=3600, show_spinner=False)
+def render_notebook_pdf(digest, _notebook_path):
     """
-    Converts an .ipynb notebook file to a PDF file using a headless browser (WebPDF).
+    Renders a notebook to PDF bytes. Cached on the digest of the notebook's
+    contents, so re-uploading an identical notebook skips the conversion.
+
+    Args:
+        digest (str): The digest of the notebook file, used as the cache key.
+        _notebook_path (str): The full path to the input notebook file
+            (not hashed by Streamlit).
+
+    Returns:
+        bytes: The PDF document.
+    """
+    # nbconvert is heavy to import, so it is only loaded on first conversion
+    import nbformat
+    from nbconvert import HTMLExporter
+
+    # 1. Read the notebook
+    # Parse without nbformat.read's schema validation; nbconvert validates the
+    # notebook itself during export.
+    with open(_notebook_path, 'rb') as f:
+        nb = nbformat.convert(nbformat.reader.reads(f.read().decode('utf-8')), 4)
+
+    # 2. Render the notebook to HTML
+    # Cells are not executed; the outputs saved in the notebook are reused.
+    # To remove the default title and date, we can use the 'exclude' options.
+    config = {
+        "Exporter": {
+            "exclude_input_prompt": True,
+            "exclude_output_prompt": True,
+            # Validate once after all preprocessors instead of after each one
+            "optimistic_validation": True,
+        }
+    }
+
+    html, resources = HTMLExporter(config=config).from_notebook_node(nb)
+
+    # 3. "Print" the HTML to PDF with the shared headless browser
+    executor, _, browser = get_browser()
+    return executor.submit(render_pdf, browser, html).result()
+
+
+def convert_notebook_to_pdf(notebook_path):
+    """
+    Converts an .ipynb notebook file to a PDF document using a headless browser (WebPDF).
     This method does not require a LaTeX installation.
 
     Args:
         notebook_path (str): The full path to the input notebook file.
-        output_path (str): The full path where the output PDF will be saved.
 
     Returns:
         bool: True if conversion is successful, False otherwise.
         str: A message indicating the result or error.
+        bytes: The PDF document, or None if the conversion failed.
     """
     try:
-        # Ensure playwright's browser dependencies are installed
-        # This is a fallback, ideally handled by packages.txt on deployment
-        try:
-            # In a deployed environment, this might not be possible, but it's good for local testing.
-            os.system("playwright install-deps")
-            os.system("playwright install chromium")
-        except Exception:
-            # Silently fail if system calls are not allowed
-            pass
-
-        # 1. Read the notebook
-        with open(notebook_path, 'r', encoding='utf-8') as f:
-            nb = nbformat.read(f, as_version=4)
-
-        # 2. Configure the WebPDF exporter
-        # This exporter uses a headless browser to "print" the notebook to PDF.
-        # To remove the default title and date, we can use the 'exclude' options.
-        config = {
-            "Exporter": {
-                "exclude_input_prompt": True,
-                "exclude_output_prompt": True,
-            }
-        }
-        
-        web_pdf_exporter = WebPDFExporter(config=config)
-        
-        # 3. Convert the notebook to PDF
-        pdf_data, resources = web_pdf_exporter.from_notebook_node(nb)
-
-        # 4. Write the PDF to a file
-        with open(output_path, 'wb') as f:
-            f.write(pdf_data)
-        
-        return True, f"Successfully converted to {os.path.basename(output_path)}"
+        pdf_data = render_notebook_pdf(file_digest(notebook_path), notebook_path)
+        return True, "Successfully converted to PDF", pdf_data
 
     except FileNotFoundError:
-        return False, f"Error: The file '{notebook_path}' was not found."
+        return False, f"Error: The file '{notebook_path}' was not found.", None
     except Exception as e:
         # Catches errors from nbconvert or playwright
         error_message = str(e)
         if "command not found" in error_message.lower() or "chromium" in error_message.lower():
              return False, ("ERROR: Headless browser (Chromium) is not installed or not found. "
-                           "Please ensure your deployment environment includes the necessary browser dependencies.")
-        return False, f"An unexpected error occurred: {e}"
+                           "Please ensure your deployment environment includes the necessary browser dependencies."), None
+        return False, f"An unexpected error occurred: {e}", None
 
 
 # --- Streamlit User Interface ---
@@ -83,53 +232,85 @@ def main():
     )
 
     st.title("📄 IPYNB to PDF Converter")
-    st.write("Upload your Jupyter Notebook (`.ipynb`) file and convert it to a PDF document.")
+    st.write("Upload one or more Jupyter Notebook (`.ipynb`) files and convert them to PDF documents.")
     st.write("---")
 
     # File uploader widget
-    uploaded_file = st.file_uploader(
-        "Choose an .ipynb file",
-        type=['ipynb']
+    uploaded_files = st.file_uploader(
+        "Choose .ipynb files",
+        type=['ipynb'],
+        accept_multiple_files=True
     )
 
-    if uploaded_file is not None:
-        # Create a temporary directory to store the uploaded file
+    if uploaded_files:
+        # Create a temporary directory to store the uploaded files
         temp_dir = "temp_files"
         if not os.path.exists(temp_dir):
             os.makedirs(temp_dir)
 
-        # Define file paths
-        input_path = os.path.join(temp_dir, uploaded_file.name)
-        file_base_name = os.path.splitext(uploaded_file.name)[0]
-        output_path = os.path.join(temp_dir, f"{file_base_name}.pdf")
+        jobs = []
+        for uploaded_file in uploaded_files:
+            # Define file paths, keyed by the upload's id so that two uploads
+            # with the same name do not overwrite each other
+            input_path = os.path.join(temp_dir, f"{uploaded_file.file_id}.ipynb")
+            file_base_name = os.path.splitext(uploaded_file.name)[0]
+            pdf_name = f"{file_base_name}.pdf"
+
+            # Save the uploaded file to the temporary location
+            with open(input_path, "wb") as f:
+                f.write(uploaded_file.getbuffer())
 
-        # Save the uploaded file to the temporary location
-        with open(input_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+            jobs.append((uploaded_file.file_id, uploaded_file.name, input_path, pdf_name))
 
-        st.success(f"Uploaded '{uploaded_file.name}' successfully.")
+        st.success(f"Uploaded {len(jobs)} file(s) successfully.")
+
+        # Results survive reruns (e.g. the one triggered by clicking a download
+        # button) in the session state, keyed by upload id. Forget files that
+        # have been removed from the uploader.
+        results = st.session_state.setdefault("results", {})
+        for file_id in set(results) - {job[0] for job in jobs}:
+            del results[file_id]
 
         # Convert button
         if st.button("Convert to PDF", type="primary"):
             with st.spinner("Converting... This may take a moment. Please wait."):
-                # Run the conversion
-                success, message = convert_notebook_to_pdf(input_path, output_path)
-
-                if success:
-                    st.success("✅ Conversion successful!")
-                    
-                    # Provide download link
-                    with open(output_path, "rb") as pdf_file:
-                        pdf_bytes = pdf_file.read()
-
-                    st.download_button(
-                        label="Download PDF",
-                        data=pdf_bytes,
-                        file_name=os.path.basename(output_path),
-                        mime="application/pdf"
-                    )
-                else:
-                    st.error(f"❌ Conversion Failed: {message}")
+                # Run the conversions concurrently; the HTML export and file
+                # I/O of one notebook overlap with the printing of another.
+                # Workers share this run's context so the caches work in them.
+                ctx = get_script_run_ctx()
+                with ThreadPoolExecutor(
+                    max_workers=os.cpu_count(),
+                    initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+                ) as pool:
+                    futures = {
+                        pool.submit(convert_notebook_to_pdf, input_path): file_id
+                        for file_id, _, input_path, _ in jobs
+                    }
+
+                    # Report progress as each notebook finishes
+                    progress = st.progress(0.0, text=f"Converted 0 of {len(jobs)}")
+                    for done, future in enumerate(as_completed(futures), start=1):
+                        results[futures[future]] = future.result()
+                        progress.progress(done / len(jobs), text=f"Converted {done} of {len(jobs)}")
+
+        for file_id, file_name, _, pdf_name in jobs:
+            if file_id not in results:
+                continue
+
+            success, message, pdf_data = results[file_id]
+            if success:
+                st.success(f"✅ '{file_name}' converted successfully!")
+
+                # Provide download link
+                st.download_button(
+                    label=f"Download {pdf_name}",
+                    data=pdf_data,
+                    file_name=pdf_name,
+                    mime="application/pdf",
+                    key=f"download-{file_id}"
+                )
+            else:
+                st.error(f"❌ Conversion of '{file_name}' failed: {message}")
 
     st.markdown("---")
     st.info(